@@ -1,50 +1,288 @@
 import json
-from dataclasses import dataclass, asdict
-from typing import List, Optional, Dict
-from datetime import datetime
+from array import array
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Dict, Set, Tuple
+from datetime import datetime, timezone
+import mmap
 import os
+import stat
+import sys
 
-@dataclass
+try:
+    import orjson
+
+    def _dumps(obj, indent: bool = False) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else None)
+
+    _loads = orjson.loads
+except ImportError:
+    # Same interface on the standard library, for environments without the wheel
+    def _dumps(obj, indent: bool = False) -> bytes:
+        if indent:
+            return json.dumps(obj, indent=2, ensure_ascii=False).encode()
+        return json.dumps(obj, separators=(',', ':'), ensure_ascii=False).encode()
+
+    def _loads(data):
+        return json.loads(bytes(data))
+
+try:
+    import ijson
+    _STREAM_ERRORS = (ijson.JSONError,)
+except ImportError:
+    ijson = None
+    _STREAM_ERRORS = ()
+
+# Number of logged mutations after which the log is folded into the snapshot
+LOG_COMPACT_THRESHOLD = 1000
+
+# Snapshot size above which cookbooks are streamed with ijson, when installed
+STREAMING_LOAD_THRESHOLD = 10 * 1024 * 1024
+
+# Length of the title substrings kept in the search index
+TITLE_GRAM_SIZE = 3
+
+def _now_iso(_now=datetime.now, _tz=timezone.utc) -> str:
+    """Current UTC time in ISO format, with lookups bound at import time"""
+    return _now(_tz).isoformat()
+
+def _title_grams(text: str) -> Set[str]:
+    """Split text into the overlapping substrings used by the title index"""
+    return {text[i:i + TITLE_GRAM_SIZE] for i in range(len(text) - TITLE_GRAM_SIZE + 1)}
+
+def _casefold_title(title: str) -> str:
+    """Search form of a title; malformed records fail with TypeError like other bad fields"""
+    if not isinstance(title, str):
+        raise TypeError(f"Recipe title must be a string, not {type(title).__name__}")
+    return title.casefold()
+
+@dataclass(slots=True)
 class Recipe:
     url: str
     title: str
     categories: List[str]
     date_added: str = None
+    title_casefold: str = field(init=False, repr=False, compare=False)
 
     def __post_init__(self):
         if self.date_added is None:
-            self.date_added = datetime.now().isoformat()
+            self.date_added = _now_iso()
+        self.title_casefold = _casefold_title(self.title)
+
+    def to_dict(self) -> dict:
+        """Serializable form of the recipe, without the deep copy done by asdict"""
+        return {
+            'url': self.url,
+            'title': self.title,
+            'categories': self.categories,
+            'date_added': self.date_added
+        }
 
-@dataclass
+    @classmethod
+    def _from_dict(cls, record: dict) -> 'Recipe':
+        """Rebuild a stored recipe without going through __init__ and __post_init__"""
+        recipe = object.__new__(cls)
+        recipe.url = record['url']
+        recipe.title = record['title']
+        recipe.categories = [sys.intern(c) for c in record['categories']]
+        recipe.date_added = record.get('date_added')
+        if recipe.date_added is None:
+            recipe.date_added = _now_iso()
+        recipe.title_casefold = _casefold_title(recipe.title)
+        return recipe
+
+@dataclass(slots=True)
 class Cookbook:
     name: str
     description: str
     recipes: List[Recipe]
+    # Category -> positions in recipes, maintained by CookbookManager
+    _by_category: Dict[str, List[int]] = field(default_factory=dict, repr=False, compare=False)
 
 class CookbookManager:
-    def __init__(self):
+    def __init__(self, filename: str = "cookbooks.json"):
         self.cookbooks: Dict[str, Cookbook] = {}
-        self.filename = "cookbooks.json"
+        self.filename = filename
+        self._log_entries = 0
+        self._dirty = False
+        self._deferred = False
+        self._titles_casefold: Dict[str, List[str]] = {}
+        # Title substring -> ids into _indexed_cookbooks/_indexed_positions, built on first search
+        self._title_index: Optional[Dict[str, array]] = None
+        self._indexed_cookbooks: List[str] = []
+        self._indexed_positions = array('I')
         self.load_data()
 
-    def load_data(self):
-        if not os.path.exists(self.filename):
-            return
+    def _log_path(self) -> str:
+        return self.filename + '.log'
 
+    def _snapshot_mode(self) -> Optional[int]:
+        """Permission bits of the snapshot file, refusing to modify a read-only store"""
         try:
-            with open(self.filename, 'r') as f:
-                data = json.load(f)
-                for cookbook_data in data:
-                    recipes = [Recipe(**r) for r in cookbook_data['recipes']]
-                    cookbook = Cookbook(
-                        name=cookbook_data['name'],
-                        description=cookbook_data['description'],
-                        recipes=recipes
-                    )
-                    self.cookbooks[cookbook.name] = cookbook
-        except (json.JSONDecodeError, KeyError, TypeError) as e:
+            mode = stat.S_IMODE(os.stat(self.filename).st_mode)
+        except FileNotFoundError:
+            return None
+        if not mode & stat.S_IWUSR:
+            raise PermissionError(f"Store is read-only: '{self.filename}'")
+        return mode
+
+    def load_data(self):
+        self.cookbooks = {}
+        self._dirty = False
+        self._deferred = False
+        try:
+            for cookbook_data in self._iter_snapshot():
+                recipes = [Recipe._from_dict(r) for r in cookbook_data['recipes']]
+                cookbook = Cookbook(
+                    name=cookbook_data['name'],
+                    description=cookbook_data['description'],
+                    recipes=recipes
+                )
+                self.cookbooks[cookbook.name] = cookbook
+        except (json.JSONDecodeError, KeyError, TypeError, *_STREAM_ERRORS) as e:
             print(f"Error loading data: {str(e)}")
             self.cookbooks = {}
+        else:
+            self._replay_log()
+        self._rebuild_indexes()
+
+    def _rebuild_indexes(self):
+        """Recompute the search structures from the loaded cookbooks"""
+        self._titles_casefold = {}
+        self._title_index = None
+        for cookbook in self.cookbooks.values():
+            cookbook._by_category = {}
+            for recipe in cookbook.recipes:
+                self._index_recipe(cookbook.name, recipe)
+
+    def _index_recipe(self, cookbook_name: str, recipe: Recipe):
+        """Register the next recipe of a cookbook with the search structures"""
+        titles = self._titles_casefold.setdefault(cookbook_name, [])
+        index = len(titles)
+        titles.append(recipe.title_casefold)
+        if self._title_index is not None:
+            self._index_title(cookbook_name, index, recipe.title_casefold)
+
+        by_category = self.cookbooks[cookbook_name]._by_category
+        for category in dict.fromkeys(recipe.categories):
+            by_category.setdefault(category, []).append(index)
+
+    def _build_title_index(self):
+        self._title_index = {}
+        self._indexed_cookbooks = []
+        self._indexed_positions = array('I')
+        for cookbook_name in self.cookbooks:
+            for index, title in enumerate(self._titles_casefold.get(cookbook_name, ())):
+                self._index_title(cookbook_name, index, title)
+
+    def _index_title(self, cookbook_name: str, index: int, title: str):
+        recipe_id = len(self._indexed_positions)
+        self._indexed_cookbooks.append(cookbook_name)
+        self._indexed_positions.append(index)
+        for gram in _title_grams(title):
+            postings = self._title_index.get(gram)
+            if postings is None:
+                postings = self._title_index[gram] = array('I')
+            postings.append(recipe_id)
+
+    def _iter_snapshot(self) -> Iterator[dict]:
+        """Yield snapshot records, streaming large files one cookbook at a time"""
+        try:
+            f = open(self.filename, 'rb')
+        except FileNotFoundError:
+            return
+
+        with f:
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                return
+            if ijson is not None and size > STREAMING_LOAD_THRESHOLD:
+                yield from ijson.items(f, 'item')
+                return
+            # Small enough to parse in one go, straight from the page cache
+            with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+                with memoryview(mm) as view:
+                    data = _loads(view)
+        yield from data
+
+    def _replay_log(self):
+        """Apply logged mutations on top of the loaded snapshot"""
+        self._log_entries = 0
+        try:
+            f = open(self._log_path(), 'rb')
+        except FileNotFoundError:
+            return
+
+        offset = 0
+        replayed: Dict[str, Set[Tuple[str, str, str]]] = {}
+        with f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # Every append ends with a newline, so this is a write cut off by a crash
+                    break
+                offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    self._apply_event(_loads(line), replayed)
+                except (ValueError, KeyError, TypeError) as e:
+                    # Left in the file; only the torn tail below is ever removed
+                    print(f"Error replaying log, skipping entry: {str(e)}")
+                    continue
+                self._log_entries += 1
+            else:
+                return
+
+        print("Error replaying log, discarding incomplete final entry")
+        try:
+            os.truncate(self._log_path(), offset)
+        except OSError as e:
+            print(f"Error truncating log: {str(e)}")
+
+    def _apply_event(self, event: dict, replayed: Dict[str, Set[Tuple[str, str, str]]]):
+        """Apply one logged mutation, skipping it if the snapshot already has it"""
+        if event['op'] == 'create_cookbook':
+            cookbook = Cookbook(name=event['name'], description=event['description'], recipes=[])
+            self.cookbooks.setdefault(cookbook.name, cookbook)
+        elif event['op'] == 'add_recipe':
+            recipe = Recipe._from_dict(event['recipe'])
+            recipes = self.cookbooks[event['cookbook']].recipes
+            keys = replayed.get(event['cookbook'])
+            if keys is None:
+                keys = replayed[event['cookbook']] = {(r.url, r.title, r.date_added) for r in recipes}
+            key = (recipe.url, recipe.title, recipe.date_added)
+            if key not in keys:
+                keys.add(key)
+                recipes.append(recipe)
+
+    def _append_log(self, event: dict) -> bool:
+        """Record a single mutation in the append-only log"""
+        if self._deferred:
+            # Deferred changes are not in the log, so it could not be replayed
+            return self.save_data()
+
+        try:
+            self._snapshot_mode()
+            # Opened per append so no handle outlives the call or points at a removed log
+            with open(self._log_path(), 'ab') as f:
+                f.write(_dumps(event) + b'\n')
+        except (PermissionError, OSError) as e:
+            print(f"Error saving data: {str(e)}")
+            return False
+
+        self._log_entries += 1
+        if self._log_entries >= LOG_COMPACT_THRESHOLD:
+            return self.compact()
+        return True
+
+    def _truncate_log(self):
+        try:
+            os.remove(self._log_path())
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # Harmless: replaying a log already in the snapshot changes nothing
+            print(f"Error removing log: {str(e)}")
+        self._log_entries = 0
 
     def save_data(self):
         data = []
@@ -52,36 +290,56 @@ class CookbookManager:
             cookbook_dict = {
                 'name': cookbook.name,
                 'description': cookbook.description,
-                'recipes': [asdict(r) for r in cookbook.recipes]
+                'recipes': [r.to_dict() for r in cookbook.recipes]
             }
             data.append(cookbook_dict)
         
+        tmp_filename = self.filename + '.tmp'
         try:
-            with open(self.filename, 'w') as f:
-                json.dump(data, f, indent=2)
+            mode = self._snapshot_mode()
+            with open(tmp_filename, 'wb') as f:
+                f.write(_dumps(data, indent=True))
+            if mode is not None:
+                os.chmod(tmp_filename, mode)
+            os.replace(tmp_filename, self.filename)
         except (PermissionError, OSError) as e:
             print(f"Error saving data: {str(e)}")
             return False
+        self._dirty = False
+        self._deferred = False
+        self._truncate_log()
         return True
 
+    def flush_if_dirty(self) -> bool:
+        """Write the snapshot only if cookbooks changed since the last save"""
+        if not self._dirty:
+            return True
+        return self.save_data()
+
+    def compact(self) -> bool:
+        """Fold the mutation log and any deferred changes into the snapshot file"""
+        if not self._log_entries and not self._deferred:
+            return True
+        return self.save_data()
+
     def validate_cookbook_name(self, name: str) -> bool:
         """Validate cookbook name"""
-        if not name or not name.strip():
+        if not name or name.isspace():
             print("Cookbook name cannot be empty or whitespace")
             return False
         return True
 
     def validate_recipe(self, url: str, title: str) -> bool:
         """Validate recipe data"""
-        if not url or not url.strip():
+        if not url or url.isspace():
             print("Recipe URL cannot be empty")
             return False
-        if not title or not title.strip():
+        if not title or title.isspace():
             print("Recipe title cannot be empty")
             return False
         return True
 
-    def create_cookbook(self, name: str, description: str) -> bool:
+    def create_cookbook(self, name: str, description: str, defer_save: bool = False) -> bool:
         """Create a new cookbook with validation"""
         if not self.validate_cookbook_name(name):
             return False
@@ -91,9 +349,14 @@ class CookbookManager:
             return False
         
         self.cookbooks[name] = Cookbook(name=name, description=description, recipes=[])
-        return self.save_data()
+        self._dirty = True
+        if defer_save:
+            self._deferred = True
+            return True
+        return self._append_log({'op': 'create_cookbook', 'name': name, 'description': description})
 
-    def add_recipe(self, cookbook_name: str, url: str, title: str, categories: List[str]) -> bool:
+    def add_recipe(self, cookbook_name: str, url: str, title: str, categories: List[str],
+                   defer_save: bool = False) -> bool:
         """Add a recipe with validation"""
         if cookbook_name not in self.cookbooks:
             print(f"Cookbook '{cookbook_name}' not found!")
@@ -102,22 +365,29 @@ class CookbookManager:
         if not self.validate_recipe(url, title):
             return False
 
-        recipe = Recipe(url=url, title=title, categories=categories)
+        recipe = Recipe(url=url, title=title, categories=[sys.intern(c) for c in categories])
         self.cookbooks[cookbook_name].recipes.append(recipe)
-        return self.save_data()
+        self._index_recipe(cookbook_name, recipe)
+        self._dirty = True
+        if defer_save:
+            self._deferred = True
+            return True
+        return self._append_log({'op': 'add_recipe', 'cookbook': cookbook_name, 'recipe': recipe.to_dict()})
 
     def list_cookbooks(self):
         if not self.cookbooks:
             print("No cookbooks found.")
             return
 
-        print("\nAvailable Cookbooks:")
-        print("-" * 40)
+        lines = ["\nAvailable Cookbooks:", "-" * 40]
         for name, cookbook in self.cookbooks.items():
-            print(f"Name: {name}")
-            print(f"Description: {cookbook.description}")
-            print(f"Number of recipes: {len(cookbook.recipes)}")
-            print("-" * 40)
+            lines.extend((
+                f"Name: {name}",
+                f"Description: {cookbook.description}",
+                f"Number of recipes: {len(cookbook.recipes)}",
+                "-" * 40
+            ))
+        sys.stdout.write("\n".join(lines) + "\n")
 
     def list_recipes(self, cookbook_name: str, category: Optional[str] = None):
         if cookbook_name not in self.cookbooks:
@@ -128,40 +398,68 @@ class CookbookManager:
         recipes = cookbook.recipes
 
         if category:
-            recipes = [r for r in recipes if category in r.categories]
+            recipes = [recipes[i] for i in cookbook._by_category.get(category, ())]
 
         if not recipes:
             print(f"No recipes found{' in category ' + category if category else ''}.")
             return
 
-        print(f"\nRecipes in '{cookbook_name}'{' (Category: ' + category + ')' if category else ''}:")
-        print("-" * 40)
+        lines = [
+            f"\nRecipes in '{cookbook_name}'{' (Category: ' + category + ')' if category else ''}:",
+            "-" * 40
+        ]
         for i, recipe in enumerate(recipes, 1):
-            print(f"{i}. {recipe.title}")
-            print(f"   URL: {recipe.url}")
-            print(f"   Categories: {', '.join(recipe.categories)}")
-            print(f"   Added: {recipe.date_added}")
-            print()
+            lines.extend((
+                f"{i}. {recipe.title}",
+                f"   URL: {recipe.url}",
+                f"   Categories: {', '.join(recipe.categories)}",
+                f"   Added: {recipe.date_added}",
+                ""
+            ))
+        sys.stdout.write("\n".join(lines) + "\n")
 
     def search_recipes(self, query: str):
+        query_fold = query.casefold()
         results = []
-        for cookbook in self.cookbooks.values():
-            for recipe in cookbook.recipes:
-                if query.lower() in recipe.title.lower():
-                    results.append((cookbook.name, recipe))
-        
+        if len(query_fold) < TITLE_GRAM_SIZE:
+            # Too short to use the index, scan the flat per-cookbook title lists
+            for cookbook_name, cookbook in self.cookbooks.items():
+                titles = self._titles_casefold.get(cookbook_name, ())
+                for i, title in enumerate(titles):
+                    if query_fold in title:
+                        results.append((cookbook_name, cookbook.recipes[i]))
+        else:
+            if self._title_index is None:
+                self._build_title_index()
+            # Only titles sharing the query's rarest substring can match
+            candidates = min(
+                (self._title_index.get(gram, ()) for gram in _title_grams(query_fold)),
+                key=len
+            )
+            order = {name: i for i, name in enumerate(self.cookbooks)}
+            matches = []
+            for recipe_id in candidates:
+                cookbook_name = self._indexed_cookbooks[recipe_id]
+                i = self._indexed_positions[recipe_id]
+                if query_fold in self._titles_casefold[cookbook_name][i]:
+                    matches.append((order[cookbook_name], i, cookbook_name))
+            for _, i, cookbook_name in sorted(matches):
+                results.append((cookbook_name, self.cookbooks[cookbook_name].recipes[i]))
+
         if not results:
             print(f"No recipes found matching '{query}'")
             return
 
-        print(f"\nSearch results for '{query}':")
-        print("-" * 40)
+        lines = [f"\nSearch results for '{query}':", "-" * 40]
         for cookbook_name, recipe in results:
-            print(f"Cookbook: {cookbook_name}")
-            print(f"Title: {recipe.title}")
-            print(f"URL: {recipe.url}")
-            print(f"Categories: {', '.join(recipe.categories)}")
-            print()
+            lines.extend((
+                f"Cookbook: {cookbook_name}",
+                f"Title: {recipe.title}",
+                f"URL: {recipe.url}",
+                f"Categories: {', '.join(recipe.categories)}",
+                ""
+            ))
+        sys.stdout.write("\n".join(lines) + "\n")
 
     def run(self):
         while True:
@@ -201,6 +499,9 @@ class CookbookManager:
                 self.search_recipes(query)
             
             elif choice == "6":
+                self.flush_if_dirty()
+                # Also folds a log left behind by an earlier session
+                self.compact()
                 print("Goodbye!")
                 break
             
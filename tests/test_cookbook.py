@@ -1,7 +1,8 @@
 import pytest
-from datetime import datetime
+from datetime import datetime, timedelta
 import json
 import os
+import stat
 import sys
 from pathlib import Path
 
@@ -30,9 +31,7 @@ def sample_cookbook(sample_recipe):
 @pytest.fixture
 def cookbook_manager(tmp_path):
     # Create manager with temporary file path
-    manager = CookbookManager()
-    manager.filename = str(tmp_path / "test_cookbooks.json")
-    return manager
+    return CookbookManager(filename=str(tmp_path / "test_cookbooks.json"))
 
 class TestRecipe:
     def test_recipe_creation(self):
@@ -52,8 +51,22 @@ class TestRecipe:
             title="Spaghetti",
             categories=["Italian"]
         )
-        # Verify date_added is in ISO format
-        datetime.fromisoformat(recipe.date_added)
+        # Verify date_added is in ISO format, recorded in UTC
+        added = datetime.fromisoformat(recipe.date_added)
+        assert added.utcoffset() == timedelta(0)
+
+    def test_recipe_to_dict(self, sample_recipe):
+        data = sample_recipe.to_dict()
+        assert data == {
+            'url': "https://example.com/recipe1",
+            'title': "Test Recipe",
+            'categories': ["Italian", "Pasta"],
+            'date_added': sample_recipe.date_added
+        }
+        # Round-trips through the fast path used by load_data
+        loaded = Recipe._from_dict(data)
+        assert loaded == sample_recipe
+        assert loaded.title_casefold == "test recipe"
 
 class TestCookbook:
     def test_cookbook_creation(self, sample_recipe):
@@ -118,9 +131,7 @@ class TestCookbookManager:
         cookbook_manager.save_data()
         
         # Create new manager instance
-        new_manager = CookbookManager()
-        new_manager.filename = cookbook_manager.filename
-        new_manager.load_data()
+        new_manager = CookbookManager(filename=cookbook_manager.filename)
         
         # Verify data was loaded correctly
         assert "Italian" in new_manager.cookbooks
@@ -128,6 +139,204 @@ class TestCookbookManager:
         recipe = new_manager.cookbooks["Italian"].recipes[0]
         assert recipe.title == "Spaghetti"
 
+    def test_load_replays_log(self, cookbook_manager):
+        # Mutations are logged without rewriting the snapshot
+        cookbook_manager.create_cookbook("Italian", "Italian recipes")
+        cookbook_manager.add_recipe(
+            "Italian",
+            "https://example.com/recipe1",
+            "Spaghetti",
+            ["Pasta"]
+        )
+        assert not os.path.exists(cookbook_manager.filename)
+
+        new_manager = CookbookManager(filename=cookbook_manager.filename)
+
+        assert "Italian" in new_manager.cookbooks
+        assert new_manager.cookbooks["Italian"].recipes[0].title == "Spaghetti"
+
+    def test_torn_log_line_keeps_valid_data(self, cookbook_manager):
+        cookbook_manager.create_cookbook("Italian", "Italian recipes")
+        cookbook_manager.add_recipe("Italian", "https://example.com/1", "Spaghetti", ["Pasta"])
+        cookbook_manager.save_data()
+        cookbook_manager.add_recipe("Italian", "https://example.com/2", "Lasagna", ["Pasta"])
+
+        # Simulate a crash in the middle of writing the next entry
+        log_path = cookbook_manager.filename + '.log'
+        with open(log_path, 'ab') as f:
+            f.write(b'{"op":"add_recipe","cook')
+
+        new_manager = CookbookManager(filename=cookbook_manager.filename)
+        titles = [r.title for r in new_manager.cookbooks["Italian"].recipes]
+        assert titles == ["Spaghetti", "Lasagna"]
+
+        # The torn line is cut off so later appends stay readable
+        new_manager.add_recipe("Italian", "https://example.com/3", "Risotto", ["Rice"])
+        reloaded = CookbookManager(filename=cookbook_manager.filename)
+        assert len(reloaded.cookbooks["Italian"].recipes) == 3
+
+    def test_log_entry_for_unknown_cookbook(self, cookbook_manager, capsys):
+        cookbook_manager.create_cookbook("Italian", "Italian recipes")
+        cookbook_manager.save_data()
+        with open(cookbook_manager.filename + '.log', 'ab') as f:
+            f.write(b'{"op":"add_recipe","cookbook":"Missing","recipe":'
+                    b'{"url":"https://example.com/1","title":"Lost","categories":[],"date_added":"D1"}}\n')
+        cookbook_manager.add_recipe("Italian", "https://example.com/2", "Later valid", ["Pasta"])
+        log_path = Path(cookbook_manager.filename + '.log')
+        log_before = log_path.read_bytes()
+        capsys.readouterr()
+
+        new_manager = CookbookManager(filename=cookbook_manager.filename)
+        assert "Missing" not in new_manager.cookbooks
+        assert [r.title for r in new_manager.cookbooks["Italian"].recipes] == ["Later valid"]
+        assert "Error replaying log, skipping entry" in capsys.readouterr().out
+
+        # Loading reports the bad entry but never rewrites the log
+        assert log_path.read_bytes() == log_before
+
+    def test_log_left_after_save_is_not_replayed_twice(self, cookbook_manager, monkeypatch):
+        cookbook_manager.create_cookbook("Italian", "Italian recipes")
+        cookbook_manager.add_recipe("Italian", "https://example.com/1", "Pasta", ["Pasta"])
+        cookbook_manager.add_recipe("Italian", "https://example.com/2", "Soup", ["Soup"])
+
+        # Snapshot is written but the log cannot be removed
+        def fail_remove(path):
+            raise OSError("log is busy")
+        monkeypatch.setattr(os, "remove", fail_remove)
+        assert cookbook_manager.save_data()
+        monkeypatch.undo()
+        assert os.path.exists(cookbook_manager.filename + '.log')
+
+        new_manager = CookbookManager(filename=cookbook_manager.filename)
+        titles = [r.title for r in new_manager.cookbooks["Italian"].recipes]
+        assert titles == ["Pasta", "Soup"]
+
+    def test_append_after_other_manager_compacts(self, cookbook_manager):
+        cookbook_manager.create_cookbook("Italian", "Italian recipes")
+        other = CookbookManager(filename=cookbook_manager.filename)
+        assert other.compact()
+
+        # The first manager must not keep writing to the removed log
+        cookbook_manager.add_recipe("Italian", "https://example.com/1", "Spaghetti", ["Pasta"])
+        new_manager = CookbookManager(filename=cookbook_manager.filename)
+        assert len(new_manager.cookbooks["Italian"].recipes) == 1
+
+    def test_compact(self, cookbook_manager):
+        cookbook_manager.create_cookbook("Italian", "Italian recipes")
+        assert cookbook_manager.compact()
+
+        # Log is folded into the snapshot and removed
+        assert os.path.exists(cookbook_manager.filename)
+        assert not os.path.exists(cookbook_manager.filename + '.log')
+
+        new_manager = CookbookManager(filename=cookbook_manager.filename)
+        assert "Italian" in new_manager.cookbooks
+
+    def test_load_streamed_snapshot(self, cookbook_manager, monkeypatch):
+        pytest.importorskip("ijson")
+        cookbook_manager.create_cookbook("Italian", "Italian recipes")
+        cookbook_manager.add_recipe(
+            "Italian",
+            "https://example.com/recipe1",
+            "Spaghetti",
+            ["Pasta"]
+        )
+        cookbook_manager.save_data()
+
+        # Force the ijson path regardless of file size
+        monkeypatch.setattr("cookbook.STREAMING_LOAD_THRESHOLD", 0)
+        new_manager = CookbookManager(filename=cookbook_manager.filename)
+        assert new_manager.cookbooks["Italian"].recipes[0].title == "Spaghetti"
+
+    def test_load_truncated_streamed_snapshot(self, cookbook_manager, monkeypatch, capsys):
+        pytest.importorskip("ijson")
+        cookbook_manager.create_cookbook("Italian", "Italian recipes")
+        cookbook_manager.save_data()
+        with open(cookbook_manager.filename, 'r+b') as f:
+            f.truncate(os.path.getsize(cookbook_manager.filename) // 2)
+
+        # Should handle the incomplete stream gracefully
+        monkeypatch.setattr("cookbook.STREAMING_LOAD_THRESHOLD", 0)
+        new_manager = CookbookManager(filename=cookbook_manager.filename)
+        assert len(new_manager.cookbooks) == 0
+        assert "Error loading data" in capsys.readouterr().out
+
+    def test_flush_if_dirty(self, cookbook_manager):
+        # Nothing changed, nothing written
+        assert cookbook_manager.flush_if_dirty()
+        assert not os.path.exists(cookbook_manager.filename)
+
+        cookbook_manager.create_cookbook("Italian", "Italian recipes")
+        assert cookbook_manager.flush_if_dirty()
+        assert os.path.exists(cookbook_manager.filename)
+        assert not os.path.exists(cookbook_manager.filename + '.tmp')
+
+    def test_exit_folds_leftover_log(self, cookbook_manager, monkeypatch):
+        # Session that logged a change but never compacted
+        cookbook_manager.create_cookbook("Italian", "Italian recipes")
+
+        # Next session exits straight away without making changes
+        manager = CookbookManager(filename=cookbook_manager.filename)
+        monkeypatch.setattr("builtins.input", lambda prompt: "6")
+        manager.run()
+
+        assert not os.path.exists(cookbook_manager.filename + '.log')
+        new_manager = CookbookManager(filename=cookbook_manager.filename)
+        assert "Italian" in new_manager.cookbooks
+
+    def test_defer_save(self, cookbook_manager):
+        assert cookbook_manager.create_cookbook("Italian", "Italian recipes", defer_save=True)
+        assert cookbook_manager.add_recipe(
+            "Italian",
+            "https://example.com/recipe1",
+            "Spaghetti",
+            ["Pasta"],
+            defer_save=True
+        )
+
+        # Nothing persisted until flushed
+        assert not os.path.exists(cookbook_manager.filename)
+        assert not os.path.exists(cookbook_manager.filename + '.log')
+
+        assert cookbook_manager.flush_if_dirty()
+        new_manager = CookbookManager(filename=cookbook_manager.filename)
+        assert len(new_manager.cookbooks["Italian"].recipes) == 1
+
+    def test_compact_writes_deferred_changes(self, cookbook_manager):
+        cookbook_manager.create_cookbook("Italian", "Italian recipes", defer_save=True)
+        assert cookbook_manager.compact()
+
+        new_manager = CookbookManager(filename=cookbook_manager.filename)
+        assert "Italian" in new_manager.cookbooks
+
+    def test_logged_change_after_deferred_change(self, cookbook_manager):
+        cookbook_manager.create_cookbook("Italian", "Italian recipes", defer_save=True)
+        cookbook_manager.add_recipe(
+            "Italian",
+            "https://example.com/recipe1",
+            "Spaghetti",
+            ["Pasta"]
+        )
+
+        # Logged recipe must not reference the unsaved cookbook on reload
+        new_manager = CookbookManager(filename=cookbook_manager.filename)
+        assert len(new_manager.cookbooks["Italian"].recipes) == 1
+
+    def test_categories_are_interned(self, cookbook_manager):
+        cookbook_manager.create_cookbook("Italian", "Italian recipes")
+        for i in range(2):
+            cookbook_manager.add_recipe(
+                "Italian",
+                f"https://example.com/recipe{i}",
+                f"Recipe {i}",
+                ["".join(["Pas", "ta"])]
+            )
+        cookbook_manager.save_data()
+
+        new_manager = CookbookManager(filename=cookbook_manager.filename)
+        first, second = new_manager.cookbooks["Italian"].recipes
+        assert first.categories[0] is second.categories[0]
+
     def test_search_recipes(self, cookbook_manager):
         # Setup test data
         cookbook_manager.create_cookbook("Italian", "Italian recipes")
@@ -166,6 +375,7 @@ class TestRecipeEdgeCases:
             categories=["Dessert"]
         )
         assert recipe.title == special_title
+        assert recipe.title_casefold == "crème brûlée & other café treats!"
 
     def test_very_long_title(self):
         long_title = "A" * 1000  # Very long title
@@ -198,6 +408,32 @@ class TestCookbookManagerFiltering:
         cookbook_manager.list_recipes("Mixed", category="Asian")
         cookbook_manager.list_recipes("Mixed", category="NonExistent")
 
+    def test_filter_by_category_after_reload(self, cookbook_manager, capsys):
+        cookbook_manager.create_cookbook("Mixed", "Mixed recipes")
+        cookbook_manager.add_recipe(
+            "Mixed",
+            "https://example.com/recipe1",
+            "Pasta Dish",
+            ["Italian", "Pasta"]
+        )
+        cookbook_manager.add_recipe(
+            "Mixed",
+            "https://example.com/recipe2",
+            "Rice Dish",
+            ["Asian", "Rice"]
+        )
+
+        new_manager = CookbookManager(filename=cookbook_manager.filename)
+        capsys.readouterr()
+
+        new_manager.list_recipes("Mixed", category="Asian")
+        out = capsys.readouterr().out
+        assert "Rice Dish" in out
+        assert "Pasta Dish" not in out
+
+        new_manager.list_recipes("Mixed", category="NonExistent")
+        assert "No recipes found in category NonExistent" in capsys.readouterr().out
+
     def test_case_insensitive_search(self, cookbook_manager):
         # Setup
         cookbook_manager.create_cookbook("Test", "Test cookbook")
@@ -213,6 +449,59 @@ class TestCookbookManagerFiltering:
         cookbook_manager.search_recipes("carbonara")
         cookbook_manager.search_recipes("SpAgHeTtI")
 
+    def test_search_finds_recipes_added_after_first_search(self, cookbook_manager, capsys):
+        cookbook_manager.create_cookbook("Test", "Test cookbook")
+        cookbook_manager.add_recipe("Test", "https://example.com/1", "Pizza Margherita", ["Italian"])
+        cookbook_manager.search_recipes("pizza")
+        capsys.readouterr()
+
+        cookbook_manager.add_recipe("Test", "https://example.com/2", "Pizza Bianca", ["Italian"])
+        cookbook_manager.search_recipes("pizza")
+        out = capsys.readouterr().out
+        assert out.index("Pizza Margherita") < out.index("Pizza Bianca")
+
+    def test_search_is_casefolded(self, cookbook_manager, capsys):
+        cookbook_manager.create_cookbook("Test", "Test cookbook")
+        cookbook_manager.add_recipe(
+            "Test",
+            "https://example.com/recipe1",
+            "Straße Pretzels",
+            ["German"]
+        )
+
+        cookbook_manager.search_recipes("STRASSE")
+        assert "Straße Pretzels" in capsys.readouterr().out
+
+    def test_search_matches_substrings(self, cookbook_manager, capsys):
+        cookbook_manager.create_cookbook("Test", "Test cookbook")
+        cookbook_manager.add_recipe(
+            "Test",
+            "https://example.com/recipe1",
+            "Spaghetti Carbonara",
+            ["Italian"]
+        )
+        cookbook_manager.add_recipe(
+            "Test",
+            "https://example.com/recipe2",
+            "Pizza Margherita",
+            ["Italian"]
+        )
+
+        # Substring inside a word
+        cookbook_manager.search_recipes("ghett")
+        out = capsys.readouterr().out
+        assert "Spaghetti Carbonara" in out
+        assert "Pizza Margherita" not in out
+
+        # Query shorter than the index substrings
+        cookbook_manager.search_recipes("pi")
+        out = capsys.readouterr().out
+        assert "Pizza Margherita" in out
+        assert "Spaghetti Carbonara" not in out
+
+        cookbook_manager.search_recipes("burger")
+        assert "No recipes found" in capsys.readouterr().out
+
 class TestDataValidation:
     def test_duplicate_cookbook_names(self, cookbook_manager):
         # First creation should succeed
@@ -252,11 +541,39 @@ class TestErrorHandling:
         corrupted_file = tmp_path / "corrupted.json"
         corrupted_file.write_text("{Invalid JSON")
         
-        manager = CookbookManager()
-        manager.filename = str(corrupted_file)
-        
         # Should handle corrupted file gracefully
-        manager.load_data()
+        manager = CookbookManager(filename=str(corrupted_file))
+        assert len(manager.cookbooks) == 0
+
+    def test_load_record_with_invalid_title(self, tmp_path, capsys):
+        bad_file = tmp_path / "bad_title.json"
+        bad_file.write_text(
+            '[{"name": "A", "description": "d", "recipes": '
+            '[{"url": "u", "title": null, "categories": [], "date_added": "D"}]}]'
+        )
+
+        # Should report the malformed record instead of raising
+        manager = CookbookManager(filename=str(bad_file))
+        assert len(manager.cookbooks) == 0
+        assert "Error loading data" in capsys.readouterr().out
+
+    def test_log_entry_with_invalid_title(self, cookbook_manager, capsys):
+        cookbook_manager.create_cookbook("Italian", "Italian recipes")
+        cookbook_manager.save_data()
+        with open(cookbook_manager.filename + '.log', 'ab') as f:
+            f.write(b'{"op":"add_recipe","cookbook":"Italian","recipe":'
+                    b'{"url":"u","title":null,"categories":[],"date_added":"D"}}\n')
+
+        manager = CookbookManager(filename=cookbook_manager.filename)
+        assert manager.cookbooks["Italian"].recipes == []
+        assert "Error replaying log, skipping entry" in capsys.readouterr().out
+
+    def test_load_empty_file(self, tmp_path):
+        empty_file = tmp_path / "empty.json"
+        empty_file.touch()
+
+        # Zero-length store cannot be memory-mapped and is treated as empty
+        manager = CookbookManager(filename=str(empty_file))
         assert len(manager.cookbooks) == 0
 
     def test_save_to_readonly_location(self, tmp_path):
@@ -264,8 +581,21 @@ class TestErrorHandling:
         readonly_file.touch()
         readonly_file.chmod(0o444)  # Make file readonly
         
-        manager = CookbookManager()
-        manager.filename = str(readonly_file)
+        manager = CookbookManager(filename=str(readonly_file))
         
         # Should handle permission error gracefully
-        manager.create_cookbook("Test", "Test cookbook")
\ No newline at end of file
+        assert not manager.create_cookbook("Test", "Test cookbook")
+        assert not manager.flush_if_dirty()
+
+        # Store is left untouched and still read-only
+        assert readonly_file.read_text() == ""
+        assert stat.S_IMODE(readonly_file.stat().st_mode) == 0o444
+
+    def test_save_keeps_file_mode(self, cookbook_manager):
+        cookbook_manager.create_cookbook("Italian", "Italian recipes")
+        cookbook_manager.save_data()
+        os.chmod(cookbook_manager.filename, 0o600)
+
+        cookbook_manager.add_recipe("Italian", "https://example.com/1", "Spaghetti", ["Pasta"])
+        assert cookbook_manager.save_data()
+        assert stat.S_IMODE(os.stat(cookbook_manager.filename).st_mode) == 0o600
\ No newline at end of file